@@ -6,7 +6,15 @@ from tkinter import filedialog, messagebox, ttk
 import os
 import re
 import json
+import math
 import ctypes
+from array import array
+
+# NumPy is only needed for the timeline view
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Fix DPI scaling for high-resolution displays
 try:
@@ -14,19 +22,569 @@ try:
 except:
     pass
 
+
+class FilterExpressionError(ValueError):
+    """Raised when a filter expression cannot be parsed"""
+
+
+_EXPRESSION_TOKEN = re.compile(r'\s*(?:(==|!=|<=|>=|=|<|>|\(|\)|\[|\]|,)|"([^"]*)"|\'([^\']*)\'|([A-Za-z0-9_.]+))')
+
+
+class _ExpressionCompiler:
+    """Recursive descent parser that turns a filter expression into Python source
+    
+    Grammar (keywords are case-insensitive):
+        expr    := and ('or' and)*
+        and     := not ('and' not)*
+        not     := 'not' not | '(' expr ')' | 'rx' | 'tx' | 'preset' NAME | test
+        test    := field [op] value | 'id' 'in' set
+        field   := id | channel | direction | dlc | time | byte[N]
+        set     := '[' value (',' value)* ']' | ['preset'] NAME ['preset']
+    
+    time is the absolute time in seconds, also for logs with relative timestamps.
+    """
+    
+    FIELDS = {"id": "id", "channel": "channel", "ch": "channel", "direction": "direction",
+              "dir": "direction", "dlc": "dlc", "time": "time"}
+    COMPARISONS = {"==": "==", "=": "==", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+    
+    def __init__(self, expression, presets, constants, preset_stack=()):
+        self.tokens = self.tokenize(expression)
+        self.pos = 0
+        self.presets = presets
+        self.constants = constants
+        self.preset_stack = preset_stack
+    
+    @staticmethod
+    def tokenize(expression):
+        tokens = []
+        pos = 0
+        expression = expression.rstrip()
+        while pos < len(expression):
+            match = _EXPRESSION_TOKEN.match(expression, pos)
+            if not match:
+                raise FilterExpressionError(f"Unexpected character at position {pos + 1}: {expression[pos:].strip()[:10]}")
+            op, dquoted, squoted, word = match.groups()
+            if op is not None:
+                tokens.append(("op", op))
+            elif word is not None:
+                tokens.append(("word", word))
+            else:
+                tokens.append(("name", dquoted if dquoted is not None else squoted))
+            pos = match.end()
+        return tokens
+    
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+    
+    def next(self):
+        token = self.peek()
+        if token[0] is None:
+            raise FilterExpressionError("Unexpected end of expression")
+        self.pos += 1
+        return token
+    
+    def accept_word(self, word):
+        kind, value = self.peek()
+        if kind == "word" and value.lower() == word:
+            self.pos += 1
+            return True
+        return False
+    
+    def expect_op(self, op):
+        kind, value = self.next()
+        if kind != "op" or value != op:
+            raise FilterExpressionError(f"Expected '{op}' but found '{value}'")
+    
+    def compile(self):
+        source = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise FilterExpressionError(f"Unexpected '{self.tokens[self.pos][1]}'")
+        return source
+    
+    def parse_or(self):
+        parts = [self.parse_and()]
+        while self.accept_word("or"):
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else "(" + " or ".join(parts) + ")"
+    
+    def parse_and(self):
+        parts = [self.parse_not()]
+        while self.accept_word("and"):
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else "(" + " and ".join(parts) + ")"
+    
+    def parse_not(self):
+        if self.accept_word("not"):
+            return "(not " + self.parse_not() + ")"
+        
+        kind, value = self.next()
+        if kind == "op" and value == "(":
+            source = self.parse_or()
+            self.expect_op(")")
+            return source
+        if kind != "word":
+            raise FilterExpressionError(f"Unexpected '{value}'")
+        
+        word = value.lower()
+        if word in ("rx", "tx"):
+            return f'(f["direction"] == {value.capitalize()!r})'
+        if word == "preset":
+            return self.preset_expression(self.parse_name())
+        if word in ("byte", "bytes"):
+            self.expect_op("[")
+            index = self.parse_number(self.next()[1], "byte index")
+            self.expect_op("]")
+            op, literal = self.parse_comparison("byte")
+            return f'(len(f["data"]) > {index} and f["data"][{index}] {op} {literal})'
+        if word in self.FIELDS:
+            field = self.FIELDS[word]
+            if self.accept_word("in"):
+                return f'(f["{field}"] in {self.parse_set(field)})'
+            op, literal = self.parse_comparison(field)
+            return f'(f["{field}"] {op} {literal})'
+        raise FilterExpressionError(f"Unknown field '{value}'")
+    
+    def parse_comparison(self, field):
+        kind, value = self.peek()
+        op = "=="
+        if kind == "op" and value in self.COMPARISONS:
+            op = self.COMPARISONS[value]
+            self.pos += 1
+        return op, repr(self.parse_value(field, self.next()[1]))
+    
+    def parse_value(self, field, text):
+        if text is None or text in "()[],":
+            raise FilterExpressionError(f"Missing value for {field}")
+        if field == "id":
+            # IDs are hex, as in the ASC log and the CAN ID list
+            try:
+                return int(text[2:] if text.lower().startswith("0x") else text, 16)
+            except ValueError:
+                raise FilterExpressionError(f"Invalid CAN ID: {text}")
+        if field == "direction":
+            if text.lower() not in ("rx", "tx"):
+                raise FilterExpressionError(f"Direction must be Rx or Tx, not {text}")
+            return text.capitalize()
+        if field == "time":
+            try:
+                return float(text)
+            except ValueError:
+                raise FilterExpressionError(f"Invalid time: {text}")
+        return self.parse_number(text, field)
+    
+    def parse_number(self, text, what):
+        try:
+            return int(text, 16) if text.lower().startswith("0x") else int(text)
+        except (AttributeError, ValueError):
+            raise FilterExpressionError(f"Invalid {what}: {text}")
+    
+    def parse_name(self):
+        kind, value = self.next()
+        if kind not in ("word", "name"):
+            raise FilterExpressionError(f"Expected a preset name but found '{value}'")
+        return value
+    
+    def parse_set(self, field):
+        kind, value = self.peek()
+        if kind == "op" and value == "[":
+            self.pos += 1
+            values = [self.parse_value(field, self.next()[1])]
+            while self.peek() == ("op", ","):
+                self.pos += 1
+                values.append(self.parse_value(field, self.next()[1]))
+            self.expect_op("]")
+        else:
+            if field != "id":
+                raise FilterExpressionError(f"Only id can be matched against a preset, not {field}")
+            self.accept_word("preset")
+            values = self.preset_ids(self.parse_name())
+            self.accept_word("preset")
+        return self.add_constant(frozenset(values))
+    
+    def add_constant(self, value):
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+    
+    def lookup_preset(self, name):
+        if name not in self.presets:
+            raise FilterExpressionError(f"Unknown preset '{name}'")
+        preset = self.presets[name]
+        return preset if isinstance(preset, dict) else {"can_ids": preset}
+    
+    def preset_ids(self, name):
+        can_ids = [c.strip() for c in self.lookup_preset(name).get("can_ids", "").split(',') if c.strip()]
+        if not can_ids:
+            raise FilterExpressionError(f"Preset '{name}' has no CAN IDs")
+        return [self.parse_value("id", can_id) for can_id in can_ids]
+    
+    def preset_expression(self, name):
+        preset = self.lookup_preset(name)
+        if not preset.get("expression"):
+            return f'(f["id"] in {self.add_constant(frozenset(self.preset_ids(name)))})'
+        if name in self.preset_stack:
+            raise FilterExpressionError(f"Preset '{name}' refers to itself")
+        nested = _ExpressionCompiler(preset["expression"], self.presets, self.constants,
+                                     self.preset_stack + (name,))
+        return nested.compile()
+
+
+_compiled_expressions = {}
+
+
+def compile_filter_expression(expression, presets):
+    """Compile a filter expression into a predicate taking a frame from parse_frame()
+    
+    Compiled predicates are cached per expression and preset contents.
+    """
+    key = (expression.strip(), json.dumps(presets, sort_keys=True))
+    if key not in _compiled_expressions:
+        constants = {}
+        body = _ExpressionCompiler(expression, presets, constants).compile()
+        namespace = dict(constants)
+        exec(compile(f"def predicate(f):\n    return {body}\n", "<filter expression>", "exec"), namespace)
+        _compiled_expressions[key] = namespace["predicate"]
+    return _compiled_expressions[key]
+
+
+class TimelineWindow:
+    """Per-ID timeline of frame occurrences and one payload byte
+    
+    Redraws only look at the visible time range and cost is bounded by the plot
+    width: one searchsorted over the pixel edges gives the frames of every column,
+    and the payload byte envelope of each column comes from range queries on a
+    min/max pyramid.
+    """
+    
+    LANE_HEIGHT = 60
+    LABEL_WIDTH = 110
+    AXIS_HEIGHT = 25
+    # Smallest pyramid bucket; fewer visible frames than this per pixel are reduced directly
+    PYRAMID_BASE = 16
+    
+    def __init__(self, parent, series, title):
+        # series maps CAN ID -> (times, payload bytes [n x 8], payload lengths, pyramid)
+        self.series = series
+        self.ids = sorted(series)
+        self.t_min = min(float(s[0][0]) for s in series.values())
+        self.t_max = max(float(s[0][-1]) for s in series.values())
+        if self.t_max <= self.t_min:
+            self.t_max = self.t_min + 1.0
+        self.view = (self.t_min, self.t_max)
+        self.drag_start = None
+        self.redraw_pending = False
+        
+        self.window = tk.Toplevel(parent)
+        self.window.title(f"Timeline - {title}")
+        self.window.geometry("1200x700")
+        
+        controls = tk.Frame(self.window)
+        controls.pack(fill=tk.X, padx=10, pady=(10, 0))
+        
+        tk.Label(controls, text="Plot byte:").pack(side=tk.LEFT)
+        self.byte_combo = ttk.Combobox(controls, values=["None"] + [str(i) for i in range(8)], width=6, state="readonly")
+        self.byte_combo.set("0")
+        self.byte_combo.pack(side=tk.LEFT, padx=5)
+        self.byte_combo.bind("<<ComboboxSelected>>", lambda e: self.schedule_redraw())
+        
+        tk.Button(controls, text="Zoom In", command=lambda: self.zoom(0.5), width=10).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Zoom Out", command=lambda: self.zoom(2.0), width=10).pack(side=tk.LEFT, padx=5)
+        tk.Button(controls, text="Reset", command=lambda: self.set_view(self.t_min, self.t_max), width=10).pack(side=tk.LEFT, padx=5)
+        tk.Label(controls, text="Mouse wheel: zoom, drag: pan").pack(side=tk.LEFT, padx=10)
+        
+        canvas_frame = tk.Frame(self.window)
+        canvas_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.canvas = tk.Canvas(canvas_frame, bg="white")
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        
+        scrollbar_y = tk.Scrollbar(canvas_frame, command=self.canvas.yview)
+        scrollbar_y.grid(row=0, column=1, sticky="ns")
+        self.canvas.config(yscrollcommand=scrollbar_y.set)
+        
+        canvas_frame.grid_rowconfigure(0, weight=1)
+        canvas_frame.grid_columnconfigure(0, weight=1)
+        
+        self.status_label = tk.Label(self.window, text="", relief=tk.SUNKEN, anchor=tk.W)
+        self.status_label.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+        self.canvas.bind("<MouseWheel>", lambda e: self.zoom(0.8 if e.delta > 0 else 1.25, e.x))
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(0.8, e.x))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(1.25, e.x))
+        self.canvas.bind("<ButtonPress-1>", self.start_drag)
+        self.canvas.bind("<B1-Motion>", self.drag)
+        
+        self.schedule_redraw()
+    
+    @staticmethod
+    def build_pyramid(payload, lengths):
+        """Per-bucket min/max of every payload byte for buckets of 16, 32, 64, ... frames
+        
+        Returns a list of (bucket size, lows, highs), finest level first. Bytes missing
+        from a frame count as 255 for the minimum and 0 for the maximum, so buckets
+        without the byte end up with min > max.
+        """
+        base = TimelineWindow.PYRAMID_BASE
+        byte_positions = np.arange(payload.shape[1])
+        lows, highs = [], []
+        # The first level is built in chunks to bound the temporary masked copies
+        chunk = base * 65536
+        for begin in range(0, len(payload), chunk):
+            block = payload[begin:begin + chunk]
+            present = lengths[begin:begin + chunk, None] > byte_positions
+            starts = np.arange(0, len(block), base)
+            lows.append(np.minimum.reduceat(np.where(present, block, 255).astype(np.uint8), starts, axis=0))
+            highs.append(np.maximum.reduceat(np.where(present, block, 0).astype(np.uint8), starts, axis=0))
+        if not lows:
+            return []
+        
+        lows, highs = np.concatenate(lows), np.concatenate(highs)
+        levels = [(base, lows, highs)]
+        while len(lows) > 1:
+            starts = np.arange(0, len(lows), 2)
+            lows = np.minimum.reduceat(lows, starts, axis=0)
+            highs = np.maximum.reduceat(highs, starts, axis=0)
+            levels.append((levels[-1][0] * 2, lows, highs))
+        return levels
+    
+    def plot_width(self):
+        return max(self.canvas.winfo_width() - self.LABEL_WIDTH - 10, 10)
+    
+    def set_view(self, t0, t1):
+        """Change the visible time range, keeping it inside the log"""
+        span = min(max(t1 - t0, 1e-6), self.t_max - self.t_min)
+        t0 = min(max(t0, self.t_min), self.t_max - span)
+        self.view = (t0, t0 + span)
+        self.schedule_redraw()
+    
+    def zoom(self, factor, x=None):
+        t0, t1 = self.view
+        if x is None:
+            center = (t0 + t1) / 2
+        else:
+            center = t0 + (x - self.LABEL_WIDTH) / self.plot_width() * (t1 - t0)
+        self.set_view(center - (center - t0) * factor, center + (t1 - center) * factor)
+    
+    def start_drag(self, event):
+        self.drag_start = (event.x, self.view)
+    
+    def drag(self, event):
+        if self.drag_start is None:
+            return
+        start_x, (t0, t1) = self.drag_start
+        shift = (event.x - start_x) / self.plot_width() * (t1 - t0)
+        self.set_view(t0 - shift, t1 - shift)
+    
+    def schedule_redraw(self):
+        # Coalesce bursts of wheel/drag events into a single redraw
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.canvas.after(15, self.redraw)
+    
+    def redraw(self):
+        self.redraw_pending = False
+        canvas = self.canvas
+        canvas.delete("all")
+        
+        width = self.plot_width()
+        t0, t1 = self.view
+        scale = width / (t1 - t0)
+        byte_text = self.byte_combo.get()
+        byte_index = int(byte_text) if byte_text.isdigit() else None
+        
+        self.draw_axis(t0, t1, width)
+        
+        # Time at the left edge of every pixel column, plus the right edge of the last one
+        edges = t0 + np.arange(width + 1) / scale
+        edges[-1] = np.nextafter(t1, np.inf)
+        
+        visible_frames = 0
+        for lane, can_id in enumerate(self.ids):
+            times = self.series[can_id][0]
+            top = self.AXIS_HEIGHT + lane * self.LANE_HEIGHT
+            bottom = top + self.LANE_HEIGHT
+            canvas.create_text(5, top + self.LANE_HEIGHT / 2, anchor="w", text=f"0x{can_id:X}", font=("Courier", 9))
+            canvas.create_line(self.LABEL_WIDTH, bottom, self.LABEL_WIDTH + width, bottom, fill="#dddddd")
+            
+            # Frames bounds[c]:bounds[c + 1] fall into pixel column c
+            bounds = np.searchsorted(times, edges)
+            if bounds[0] >= bounds[-1]:
+                continue
+            visible_frames += int(bounds[-1] - bounds[0])
+            
+            # Occurrence: one rectangle per run of adjacent pixel columns holding frames
+            occupied = np.flatnonzero(np.diff(bounds))
+            if not len(occupied):
+                continue
+            breaks = np.flatnonzero(np.diff(occupied) > 1)
+            run_starts = occupied[np.r_[0, breaks + 1]]
+            run_ends = occupied[np.r_[breaks, len(occupied) - 1]]
+            for first, last in zip(run_starts.tolist(), run_ends.tolist()):
+                canvas.create_rectangle(self.LABEL_WIDTH + first, bottom - 10, self.LABEL_WIDTH + last + 1, bottom - 4,
+                                        fill="#4CAF50", outline="")
+            
+            if byte_index is None:
+                continue
+            columns, lows, highs = self.byte_envelope(self.series[can_id], bounds, byte_index)
+            if not len(columns):
+                continue
+            
+            # Min/max decimation: each pixel column becomes a vertical span from its
+            # smallest to its largest value, all joined into a single polyline
+            plot_height = self.LANE_HEIGHT - 20
+            baseline = bottom - 14
+            coords = np.empty(len(columns) * 4)
+            coords[0::4] = coords[2::4] = self.LABEL_WIDTH + columns
+            coords[1::4] = baseline - lows / 255 * plot_height
+            coords[3::4] = baseline - highs / 255 * plot_height
+            canvas.create_line(*coords.tolist(), fill="#1f77b4")
+        
+        total_height = self.AXIS_HEIGHT + len(self.ids) * self.LANE_HEIGHT
+        canvas.config(scrollregion=(0, 0, self.LABEL_WIDTH + width, total_height))
+        self.status_label.config(text=f"{t0:.6f}s - {t1:.6f}s  |  {len(self.ids)} IDs  |  {visible_frames:,} frames in view")
+    
+    def byte_envelope(self, series, bounds, byte_index):
+        """Return pixel columns with the min and max of one payload byte
+        
+        Each column's frame range is answered from the raw frames at its unaligned
+        ends plus whole pyramid buckets in between, so the cost is O(width * log n).
+        """
+        _, payload, lengths, pyramid = series
+        base = self.PYRAMID_BASE
+        first, last = bounds[:-1], bounds[1:]
+        lows = np.full(len(first), 255, dtype=np.uint8)
+        highs = np.zeros(len(first), dtype=np.uint8)
+        
+        # Raw frames before the first and after the last whole bucket of each column
+        inner_first = np.minimum(-(-first // base) * base, last)
+        inner_last = np.maximum(last // base * base, inner_first)
+        for begin, end in ((first, inner_first), (inner_last, last)):
+            for offset in range(base - 1):
+                take = begin + offset < end
+                if not take.any():
+                    break
+                index = begin[take] + offset
+                present = lengths[index] > byte_index
+                values = payload[index, byte_index]
+                lows[take] = np.minimum(lows[take], np.where(present, values, 255))
+                highs[take] = np.maximum(highs[take], np.where(present, values, 0))
+        
+        # Whole buckets, walking up the pyramid like a bottom-up segment tree query
+        left, right = inner_first // base, inner_last // base
+        for _, level_lows, level_highs in pyramid:
+            active = left < right
+            if not active.any():
+                break
+            for take, bucket in ((active & (left % 2 == 1), left), (active & (right % 2 == 1), right - 1)):
+                lows[take] = np.minimum(lows[take], level_lows[bucket[take], byte_index])
+                highs[take] = np.maximum(highs[take], level_highs[bucket[take], byte_index])
+            left, right = (left + 1) // 2, right // 2
+        
+        # Columns without frames, or whose frames all lack the byte, end up with min > max
+        columns = np.flatnonzero(lows <= highs)
+        return columns, lows[columns], highs[columns]
+    
+    def draw_axis(self, t0, t1, width):
+        """Draw time tick labels at a 1/2/5 step giving roughly 8 ticks"""
+        raw_step = (t1 - t0) / 8
+        magnitude = 10 ** math.floor(math.log10(raw_step))
+        step = next(m * magnitude for m in (1, 2, 5, 10) if m * magnitude >= raw_step)
+        decimals = max(0, -int(math.floor(math.log10(step))))
+        
+        tick = math.ceil(t0 / step) * step
+        while tick <= t1:
+            x = self.LABEL_WIDTH + (tick - t0) / (t1 - t0) * width
+            self.canvas.create_line(x, self.AXIS_HEIGHT - 5, x, self.AXIS_HEIGHT, fill="#888888")
+            self.canvas.create_text(x, self.AXIS_HEIGHT - 7, anchor="s", text=f"{tick:.{decimals}f}", font=("Arial", 8))
+            tick += step
+
+
+class FrameReader:
+    """Parses the lines of one pass over an ASC log in order
+    
+    Timestamps are turned into absolute times, also for logs whose header says
+    "timestamps relative". The last line is cached, so the filter and its caller
+    can both ask for the same line without parsing it twice. Absolute times are
+    only correct if every line of the log goes through read(), timestamp_of()
+    or track().
+    """
+    
+    def __init__(self, tool):
+        self.tool = tool
+        self.relative = False
+        self.elapsed = 0.0
+        self.last_line = None
+        self.last_frame = None
+        self.frame_parsed = False
+        self.timestamp = None
+    
+    def advance(self, line, timestamp):
+        """Make line the current one, given its raw timestamp"""
+        if timestamp is None:
+            lowered = line.lower()
+            if lowered.startswith("base") and "timestamps relative" in lowered:
+                self.relative = True
+        elif self.relative:
+            self.elapsed += timestamp
+            timestamp = self.elapsed
+        
+        self.last_line = line
+        self.last_frame = None
+        self.frame_parsed = False
+        self.timestamp = timestamp
+    
+    def timestamp_of(self, line):
+        """Return the absolute time of a line without parsing the frame, or None"""
+        if line is not self.last_line:
+            self.advance(line, self.tool.parse_timestamp(line))
+        return self.timestamp
+    
+    def read(self, line):
+        """Return the frame of a line (see parse_frame) with its absolute time, or None"""
+        if line is not self.last_line:
+            frame = self.tool.parse_frame(line)
+            self.advance(line, frame["time"] if frame is not None else self.tool.parse_timestamp(line))
+        elif not self.frame_parsed:
+            frame = self.tool.parse_frame(line)
+        else:
+            return self.last_frame
+        
+        if frame is not None:
+            frame["time"] = self.timestamp
+        self.last_frame = frame
+        self.frame_parsed = True
+        return frame
+    
+    def track(self, line):
+        """Keep the reader in step with a line whose frame may not be needed
+        
+        Only relative logs need its timestamp; otherwise just watch for the base line.
+        """
+        if self.relative or line[:4].lower() == "base":
+            self.timestamp_of(line)
+
+
 class CANFilterTool:
     def __init__(self, root):
         self.root = root
         self.root.title("CAN ID Filter Tool - Enhanced")
         self.root.geometry("800x600")
         self.root.resizable(True, True)
-        self.root.minsize(1200, 1050)  # Minimum size to prevent it from being too small
+        self.root.minsize(1200, 1150)  # Minimum size to prevent it from being too small
         
         self.input_file_var = tk.StringVar()
         self.output_file_var = tk.StringVar()
         self.case_sensitive_var = tk.BooleanVar(value=False)
         self.exclude_mode_var = tk.BooleanVar(value=False)
         self.exact_match_var = tk.BooleanVar(value=False)
+        self.delta_mode_var = tk.BooleanVar(value=False)
+        self.keepalive_seconds_var = tk.StringVar()
+        self.delta_masks_var = tk.StringVar()
+        self.split_seconds_var = tk.StringVar()
+        self.split_megabytes_var = tk.StringVar()
+        self.split_filter_var = tk.BooleanVar(value=False)
         
         self.presets_file = "can_id_presets.json"
         
@@ -58,12 +616,27 @@ class CANFilterTool:
         self.can_ids_entry = tk.Entry(filter_frame, width=60)
         self.can_ids_entry.grid(row=0, column=1, columnspan=2, padx=5, pady=5)
         
+        # Expression overrides the CAN ID list, e.g. (id in powertrain and channel 2 and rx) or id 0x7E8
+        tk.Label(filter_frame, text="Filter Expression (optional):").grid(row=4, column=0, sticky="w", pady=5)
+        self.expression_entry = tk.Entry(filter_frame, width=60)
+        self.expression_entry.grid(row=4, column=1, columnspan=2, padx=5, pady=5)
+        
         # Checkboxes with larger font and bigger checkbox squares
         checkbox_font = ("Arial", 11)
         ttk.Checkbutton(filter_frame, text="Case Sensitive", variable=self.case_sensitive_var, style='Large.TCheckbutton').grid(row=1, column=0, sticky="w", pady=8, padx=5)
         ttk.Checkbutton(filter_frame, text="Exclude Mode (inverse)", variable=self.exclude_mode_var, style='Large.TCheckbutton').grid(row=1, column=1, sticky="w", pady=8, padx=5)
         ttk.Checkbutton(filter_frame, text="Exact Match", variable=self.exact_match_var, style='Large.TCheckbutton').grid(row=1, column=2, sticky="w", pady=8, padx=5)
         
+        # Change-only (delta) output
+        ttk.Checkbutton(filter_frame, text="Change-only Output (drop repeated payloads)", variable=self.delta_mode_var, style='Large.TCheckbutton').grid(row=2, column=0, columnspan=2, sticky="w", pady=8, padx=5)
+        keepalive_frame = tk.Frame(filter_frame)
+        keepalive_frame.grid(row=2, column=2, sticky="w", padx=5)
+        tk.Label(keepalive_frame, text="Keep-alive every (s):").pack(side=tk.LEFT)
+        tk.Entry(keepalive_frame, textvariable=self.keepalive_seconds_var, width=8).pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(filter_frame, text="Payload masks (ID:mask; ...):").grid(row=3, column=0, sticky="w", pady=5)
+        tk.Entry(filter_frame, textvariable=self.delta_masks_var, width=60).grid(row=3, column=1, columnspan=2, padx=5, pady=5)
+        
         # Presets Frame
         preset_frame = tk.LabelFrame(self.root, text="CAN ID Presets", padx=10, pady=10)
         preset_frame.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
@@ -80,20 +653,34 @@ class CANFilterTool:
         
         tk.Button(preset_frame, text="Load", command=self.load_preset, width=12).grid(row=1, column=2, padx=5, pady=5)
         
+        # Split Options Frame
+        split_frame = tk.LabelFrame(self.root, text="Split Options", padx=10, pady=10)
+        split_frame.grid(row=3, column=0, padx=10, pady=10, sticky="ew")
+        
+        tk.Label(split_frame, text="Split every (seconds):").grid(row=0, column=0, sticky="w", pady=5)
+        tk.Entry(split_frame, textvariable=self.split_seconds_var, width=15).grid(row=0, column=1, sticky="w", padx=5, pady=5)
+        
+        tk.Label(split_frame, text="Split every (MB):").grid(row=0, column=2, sticky="w", pady=5)
+        tk.Entry(split_frame, textvariable=self.split_megabytes_var, width=15).grid(row=0, column=3, sticky="w", padx=5, pady=5)
+        
+        ttk.Checkbutton(split_frame, text="Apply filter while splitting", variable=self.split_filter_var, style='Large.TCheckbutton').grid(row=1, column=0, columnspan=4, sticky="w", pady=8, padx=5)
+        
         # Progress Bar
         self.progress = ttk.Progressbar(self.root, length=730, mode='determinate')
-        self.progress.grid(row=3, column=0, padx=10, pady=10)
+        self.progress.grid(row=4, column=0, padx=10, pady=10)
         
         # Status Label
         self.status_label = tk.Label(self.root, text="Ready", relief=tk.SUNKEN, anchor=tk.W)
-        self.status_label.grid(row=4, column=0, sticky="ew", padx=10, pady=5)
+        self.status_label.grid(row=5, column=0, sticky="ew", padx=10, pady=5)
         
         # Action Buttons
         button_frame = tk.Frame(self.root)
-        button_frame.grid(row=5, column=0, pady=10)
+        button_frame.grid(row=6, column=0, pady=10)
         
         tk.Button(button_frame, text="Filter", command=self.filter_can_ids, width=15, bg="#4CAF50", fg="white", font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Split", command=self.split_log, width=15).pack(side=tk.LEFT, padx=5)
         tk.Button(button_frame, text="Preview (250 lines)", command=self.preview_results, width=18).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Timeline", command=self.show_timeline, width=15).pack(side=tk.LEFT, padx=5)
         tk.Button(button_frame, text="Clear", command=self.clear_fields, width=15).pack(side=tk.LEFT, padx=5)
     
     def select_input_file(self):
@@ -153,10 +740,129 @@ class CANFilterTool:
         
         return False
     
+    def build_line_matcher(self, reader=None):
+        """Return a function telling whether a line passes the filter, or None if the filter is invalid
+        
+        Expressions read frames through reader, so a caller sharing it gets each line parsed once.
+        The matcher must see every line of the log for frame times to be absolute.
+        """
+        exclude = self.exclude_mode_var.get()
+        expression = self.expression_entry.get().strip()
+        
+        if expression:
+            try:
+                predicate = compile_filter_expression(expression, self.load_presets_from_file())
+            except FilterExpressionError as e:
+                messagebox.showerror("Error", f"Invalid filter expression:\n{str(e)}")
+                return None
+            
+            read = (reader or FrameReader(self)).read
+            
+            def match_expression(line):
+                frame = read(line)
+                return (frame is not None and predicate(frame)) != exclude
+            
+            return match_expression
+        
+        can_ids = self.validate_can_ids(self.can_ids_entry.get())
+        if not can_ids:
+            return None
+        return lambda line: self.match_line(line, can_ids) != exclude
+    
+    def parse_frame(self, line):
+        """Parse a CAN or CAN FD frame line into its fields, or None for any other line"""
+        tokens = line.split()
+        try:
+            if len(tokens) > 1 and tokens[1] == "CANFD":
+                # <time> CANFD <ch> <Rx|Tx> <id> [name] <brs> <esi> <dlc> <len> <data...>
+                pos = 5
+                if tokens[pos] not in ("0", "1"):
+                    pos += 1  # optional symbolic message name
+                dlc = int(tokens[pos + 2], 16)
+                length = int(tokens[pos + 3])
+                data_start = pos + 4
+                channel, direction, raw_id = tokens[2], tokens[3], tokens[4]
+            else:
+                # <time> <ch> <id> <Rx|Tx> d <dlc> <data...>
+                if tokens[4] != "d":
+                    return None
+                dlc = int(tokens[5], 16)
+                length = dlc
+                data_start = 6
+                channel, raw_id, direction = tokens[1], tokens[2], tokens[3]
+            if direction not in ("Rx", "Tx"):
+                return None
+            return {
+                "time": float(tokens[0]),
+                "channel": int(channel),
+                "id": int(raw_id.rstrip("xX"), 16),
+                "direction": direction,
+                "dlc": dlc,
+                "data": bytes.fromhex(" ".join(tokens[data_start:data_start + length])),
+            }
+        except (IndexError, ValueError):
+            return None
+    
+    def is_frame_line(self, line):
+        """Cheap check whether a line has the shape of a frame accepted by parse_frame"""
+        tokens = line.split(None, 5)
+        if len(tokens) < 5 or tokens[3] not in ("Rx", "Tx"):
+            return False
+        return tokens[1] == "CANFD" or tokens[4] == "d"
+    
+    def create_delta_state(self):
+        """Read the change-only options and return the state used by is_repeated_frame"""
+        keepalive = None
+        keepalive_str = self.keepalive_seconds_var.get().strip()
+        if keepalive_str:
+            try:
+                keepalive = float(keepalive_str)
+            except ValueError:
+                keepalive = 0
+            if keepalive <= 0:
+                messagebox.showerror("Error", "Keep-alive interval must be a positive number of seconds.")
+                return None
+        
+        # Masks look like "0x123:FF FF FF FF FF FF 00 00; 7E8:00FF" - 00 bytes are ignored
+        masks = {}
+        for entry in self.delta_masks_var.get().split(';'):
+            if not entry.strip():
+                continue
+            try:
+                can_id, mask = entry.split(':', 1)
+                mask = bytes.fromhex(mask)
+                if not mask:
+                    raise ValueError("empty mask")
+                masks[int(can_id.strip(), 16)] = mask
+            except ValueError:
+                messagebox.showerror("Error", f"Invalid payload mask: {entry.strip()}")
+                return None
+        
+        return {"keepalive": keepalive, "masks": masks, "last_payload": {}, "last_written": {}}
+    
+    def is_repeated_frame(self, frame, delta_state):
+        """Check if a frame carries the same (masked) payload as the previous frame of its ID"""
+        key = (frame["channel"], frame["id"])
+        payload = frame["data"]
+        mask = delta_state["masks"].get(frame["id"])
+        if mask:
+            # Bytes beyond the end of the mask are always compared
+            payload = bytes(b & m for b, m in zip(payload, mask)) + payload[len(mask):]
+        
+        last_payload = delta_state["last_payload"]
+        last_written = delta_state["last_written"]
+        keepalive = delta_state["keepalive"]
+        if key in last_payload and last_payload[key] == payload:
+            if keepalive is None or frame["time"] - last_written[key] < keepalive:
+                return True
+        
+        last_payload[key] = payload
+        last_written[key] = frame["time"]
+        return False
+    
     def filter_can_ids(self):
         input_file = self.input_file_var.get()
         output_file = self.output_file_var.get()
-        can_ids_str = self.can_ids_entry.get()
         
         if not input_file or not output_file:
             messagebox.showerror("Error", "Please provide both input and output files.")
@@ -166,10 +872,17 @@ class CANFilterTool:
             messagebox.showerror("Error", "Input file does not exist!")
             return
         
-        can_ids = self.validate_can_ids(can_ids_str)
-        if not can_ids:
+        reader = FrameReader(self)
+        matcher = self.build_line_matcher(reader)
+        if not matcher:
             return
         
+        delta_state = None
+        if self.delta_mode_var.get():
+            delta_state = self.create_delta_state()
+            if delta_state is None:
+                return
+        
         # Check output directory is writable
         output_dir = os.path.dirname(output_file)
         if output_dir and not os.access(output_dir, os.W_OK):
@@ -185,6 +898,8 @@ class CANFilterTool:
             bytes_read = 0
             total_lines = 0
             matched_lines = 0
+            suppressed_lines = 0
+            last_written_time = 0.0
             
             with open(input_file, "r", encoding='utf-8', errors='ignore') as log:
                 with open(output_file, "w", encoding='utf-8') as output:
@@ -197,24 +912,46 @@ class CANFilterTool:
                             self.progress['value'] = (bytes_read / file_size) * 100
                             self.root.update_idletasks()
                         
-                        match_found = self.match_line(line, can_ids)
+                        # Every line goes through the reader so frame times stay absolute;
+                        # frames are only parsed for lines that pass the filter
+                        reader.track(line)
+                        if not matcher(line):
+                            continue
+                        
+                        matched_lines += 1
+                        if delta_state is not None:
+                            frame = reader.read(line)
+                            if frame is not None and self.is_repeated_frame(frame, delta_state):
+                                suppressed_lines += 1
+                                continue
                         
-                        # Apply exclude mode logic
-                        if (match_found and not self.exclude_mode_var.get()) or \
-                           (not match_found and self.exclude_mode_var.get()):
-                            matched_lines += 1
-                            output.write(line)
+                        if reader.relative:
+                            # Fold the deltas of dropped lines into the next written line
+                            timestamp = reader.timestamp_of(line)
+                            if timestamp is not None:
+                                line = self.retime_line(line, timestamp - last_written_time)
+                                last_written_time = timestamp
+                        output.write(line)
             
             self.progress['value'] = 100
             self.status_label.config(text="Filtering complete!")
             
             percentage = (matched_lines / total_lines * 100) if total_lines > 0 else 0
             
+            delta_summary = ""
+            if delta_state is not None:
+                written_lines = matched_lines - suppressed_lines
+                ratio = f"{matched_lines / written_lines:.1f}:1" if written_lines > 0 else "n/a"
+                delta_summary = (f"Unchanged frames dropped: {suppressed_lines:,}\n"
+                                 f"Written lines: {written_lines:,}\n"
+                                 f"Compression ratio: {ratio}\n")
+            
             messagebox.showinfo("Success", 
                 f"Filtering complete!\n\n"
                 f"Total lines: {total_lines:,}\n"
                 f"Matched lines: {matched_lines:,}\n"
-                f"Percentage: {percentage:.2f}%\n\n"
+                f"Percentage: {percentage:.2f}%\n"
+                f"{delta_summary}\n"
                 f"Output saved to:\n{output_file}")
             
         except Exception as e:
@@ -226,7 +963,6 @@ class CANFilterTool:
     def preview_results(self):
         """Show first 250 matching lines"""
         input_file = self.input_file_var.get()
-        can_ids_str = self.can_ids_entry.get()
         
         if not input_file:
             messagebox.showerror("Error", "Please select an input file.")
@@ -236,8 +972,8 @@ class CANFilterTool:
             messagebox.showerror("Error", "Input file does not exist!")
             return
         
-        can_ids = self.validate_can_ids(can_ids_str)
-        if not can_ids:
+        matcher = self.build_line_matcher()
+        if not matcher:
             return
         
         preview_window = tk.Toplevel(self.root)
@@ -274,10 +1010,7 @@ class CANFilterTool:
             count = 0
             with open(input_file, "r", encoding='utf-8', errors='ignore') as log:
                 for line in log:
-                    match_found = self.match_line(line, can_ids)
-                    
-                    if (match_found and not self.exclude_mode_var.get()) or \
-                       (not match_found and self.exclude_mode_var.get()):
+                    if matcher(line):
                         text_widget.insert(tk.END, line)
                         count += 1
                         if count >= 250:
@@ -294,21 +1027,330 @@ class CANFilterTool:
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
     
+    def show_timeline(self):
+        """Plot occurrences and payload bytes of the filtered IDs over time"""
+        input_file = self.input_file_var.get()
+        
+        if np is None:
+            messagebox.showerror("Error", "The timeline view requires NumPy.\n\nInstall it with: pip install numpy")
+            return
+        
+        if not input_file:
+            messagebox.showerror("Error", "Please select an input file.")
+            return
+        
+        if not os.path.exists(input_file):
+            messagebox.showerror("Error", "Input file does not exist!")
+            return
+        
+        reader = FrameReader(self)
+        matcher = self.build_line_matcher(reader)
+        if not matcher:
+            return
+        
+        try:
+            self.status_label.config(text="Building timeline...")
+            self.progress['value'] = 0
+            self.root.update_idletasks()
+            
+            series = self.build_timeline_series(input_file, matcher, reader)
+            
+            self.progress['value'] = 100
+            self.status_label.config(text="Timeline ready!")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            self.status_label.config(text="Error occurred!")
+            return
+        finally:
+            self.progress['value'] = 0
+        
+        if not series:
+            messagebox.showinfo("Timeline", "No matching frames found in the file.")
+            return
+        
+        TimelineWindow(self.root, series, os.path.basename(input_file))
+    
+    def build_timeline_series(self, input_file, matcher, reader):
+        """Stream the log once and collect per-ID NumPy arrays of times and the first 8 payload bytes
+        
+        reader must be the one the matcher was built with, so every line is parsed once.
+        """
+        file_size = os.path.getsize(input_file)
+        bytes_read = 0
+        total_lines = 0
+        
+        # Growable buffers per ID while streaming; converted to NumPy arrays at the end
+        buffers = {}
+        with open(input_file, "r", encoding='utf-8', errors='ignore') as log:
+            for line in log:
+                total_lines += 1
+                bytes_read += len(line)
+                
+                if total_lines % 100 == 0:
+                    self.progress['value'] = (bytes_read / file_size) * 100
+                    self.root.update_idletasks()
+                
+                # Every line goes through the reader so frame times are absolute
+                reader.track(line)
+                if not matcher(line):
+                    continue
+                frame = reader.read(line)
+                if frame is None:
+                    continue
+                
+                buffer = buffers.get(frame["id"])
+                if buffer is None:
+                    buffer = buffers[frame["id"]] = (array('d'), bytearray(), bytearray())
+                data = frame["data"][:8]
+                buffer[0].append(frame["time"])
+                buffer[1].extend(data.ljust(8, b"\0"))
+                buffer[2].append(len(data))
+        
+        series = {}
+        for can_id, (times, payload, lengths) in buffers.items():
+            times = np.frombuffer(times, dtype=np.float64)
+            payload = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 8)
+            lengths = np.frombuffer(lengths, dtype=np.uint8)
+            # The view relies on sorted times for searchsorted and per-pixel reduction
+            if len(times) > 1 and np.any(np.diff(times) < 0):
+                order = np.argsort(times, kind="stable")
+                times, payload, lengths = times[order], payload[order], lengths[order]
+            series[can_id] = (times, payload, lengths, TimelineWindow.build_pyramid(payload, lengths))
+        return series
+    
+    def retime_line(self, line, timestamp):
+        """Replace the leading timestamp of an ASC line, keeping its indentation"""
+        body = line.lstrip()
+        start = len(line) - len(body)
+        end = start + len(body.split(None, 1)[0])
+        return f"{line[:start]}{timestamp:.6f}{line[end:]}"
+    
+    def parse_timestamp(self, line):
+        """Return the leading timestamp of an ASC line, or None for header/footer lines"""
+        parts = line.split(None, 1)
+        if not parts:
+            return None
+        try:
+            return float(parts[0])
+        except ValueError:
+            return None
+    
+    def read_split_limits(self):
+        """Read split interval (seconds) and piece size (bytes) from the Split Options"""
+        limits = []
+        for var, label in ((self.split_seconds_var, "seconds"), (self.split_megabytes_var, "MB")):
+            value = var.get().strip()
+            if not value:
+                limits.append(None)
+                continue
+            try:
+                number = float(value)
+            except ValueError:
+                number = 0
+            if number <= 0:
+                messagebox.showerror("Error", f"Split every ({label}) must be a positive number.")
+                return None
+            limits.append(number)
+        
+        if limits[0] is None and limits[1] is None:
+            messagebox.showerror("Error", "Please provide a split interval in seconds and/or MB.")
+            return None
+        
+        seconds, megabytes = limits
+        max_bytes = int(megabytes * 1024 * 1024) if megabytes else None
+        return seconds, max_bytes
+    
+    def split_log(self):
+        """Split the input log into several ASC files in a single pass"""
+        input_file = self.input_file_var.get()
+        output_file = self.output_file_var.get()
+        
+        if not input_file or not output_file:
+            messagebox.showerror("Error", "Please provide both input and output files.")
+            return
+        
+        if not os.path.exists(input_file):
+            messagebox.showerror("Error", "Input file does not exist!")
+            return
+        
+        limits = self.read_split_limits()
+        if not limits:
+            return
+        split_seconds, max_bytes = limits
+        
+        reader = FrameReader(self)
+        matcher = None
+        if self.split_filter_var.get():
+            matcher = self.build_line_matcher(reader)
+            if not matcher:
+                return
+        
+        output_dir = os.path.dirname(output_file)
+        if output_dir and not os.access(output_dir, os.W_OK):
+            messagebox.showerror("Error", "Cannot write to output directory!")
+            return
+        
+        # Pieces are named after the output file: trace.asc -> trace_part001.asc, ...
+        base, ext = os.path.splitext(output_file)
+        ext = ext or ".asc"
+        manifest_file = f"{base}_manifest.json"
+        
+        piece = None
+        pieces = []
+        
+        def close_piece():
+            if has_trigger_block:
+                piece["file"].write("End TriggerBlock\n")
+            piece["file"].close()
+            pieces.append({
+                "file": os.path.basename(piece["path"]),
+                # ASC timestamps have microsecond resolution
+                "start_time": round(piece["start_time"], 6),
+                "end_time": round(piece["end_time"], 6),
+                "frames": piece["frames"],
+                "size_bytes": os.path.getsize(piece["path"]),
+            })
+        
+        def open_piece(window_start):
+            path = f"{base}_part{len(pieces) + 1:03d}{ext}"
+            f = open(path, "w", encoding='utf-8')
+            f.writelines(header_lines)
+            # The size limit covers the copied header and the closing line as well
+            return {"path": path, "file": f, "window_start": window_start,
+                    "start_time": None, "end_time": None, "last_time": None, "frames": 0, "bytes": overhead_bytes}
+        
+        try:
+            self.status_label.config(text="Splitting in progress...")
+            self.progress['value'] = 0
+            self.root.update_idletasks()
+            
+            file_size = os.path.getsize(input_file)
+            bytes_read = 0
+            total_lines = 0
+            written_frames = 0
+            # Text mode writes os.linesep for every "\n"
+            newline_extra = len(os.linesep) - 1
+            
+            # Everything before the first timestamped line (date, base, internal events,
+            # Begin Triggerblock, comments) is the header copied into every piece
+            header_lines = []
+            has_trigger_block = False
+            in_header = True
+            overhead_bytes = 0
+            
+            with open(input_file, "r", encoding='utf-8', errors='ignore') as log:
+                for line in log:
+                    total_lines += 1
+                    # ASC logs are plain ASCII, so character count equals byte count
+                    bytes_read += len(line)
+                    
+                    if total_lines % 100 == 0:
+                        self.progress['value'] = (bytes_read / file_size) * 100
+                        self.root.update_idletasks()
+                    
+                    # Absolute time, also for "timestamps relative" logs
+                    timestamp = reader.timestamp_of(line)
+                    line_bytes = len(line) + newline_extra
+                    
+                    if in_header:
+                        if timestamp is None:
+                            if line.lower().startswith("begin triggerblock"):
+                                has_trigger_block = True
+                            header_lines.append(line)
+                            continue
+                        in_header = False
+                        overhead_bytes = sum(len(header_line) + newline_extra for header_line in header_lines)
+                        if has_trigger_block:
+                            overhead_bytes += len("End TriggerBlock\n") + newline_extra
+                    
+                    if timestamp is None:
+                        # The closing line is re-added to every piece by close_piece()
+                        if has_trigger_block and line.lower().startswith("end triggerblock"):
+                            continue
+                        if piece is not None:
+                            piece["file"].write(line)
+                            piece["bytes"] += line_bytes
+                        continue
+                    
+                    if matcher is not None and not matcher(line):
+                        continue
+                    
+                    if piece is None:
+                        piece = open_piece(timestamp)
+                    elif (split_seconds and timestamp >= piece["window_start"] + split_seconds) or \
+                         (max_bytes and piece["bytes"] + line_bytes > max_bytes and piece["bytes"] > overhead_bytes):
+                        window_start = piece["window_start"]
+                        if split_seconds:
+                            # Keep time windows aligned to the first frame, even across gaps
+                            window_start += split_seconds * ((timestamp - window_start) // split_seconds)
+                        else:
+                            window_start = timestamp
+                        close_piece()
+                        piece = open_piece(window_start)
+                    
+                    if reader.relative:
+                        # Deltas restart at 0 in every piece and absorb filtered-out lines
+                        previous = piece["last_time"]
+                        line = self.retime_line(line, timestamp - previous if previous is not None else 0.0)
+                        line_bytes = len(line) + newline_extra
+                        piece["last_time"] = timestamp
+                    
+                    piece["file"].write(line)
+                    piece["bytes"] += line_bytes
+                    if piece["start_time"] is None:
+                        piece["start_time"] = timestamp
+                    piece["end_time"] = timestamp
+                    # Only CAN frames count, not measurement start, error frames or other events
+                    if self.is_frame_line(line):
+                        piece["frames"] += 1
+                        written_frames += 1
+            
+            if piece is not None:
+                close_piece()
+                piece = None
+            
+            with open(manifest_file, "w") as f:
+                json.dump({"source": os.path.basename(input_file), "pieces": pieces}, f, indent=2)
+            
+            self.progress['value'] = 100
+            self.status_label.config(text="Splitting complete!")
+            
+            messagebox.showinfo("Success",
+                f"Splitting complete!\n\n"
+                f"Total lines: {total_lines:,}\n"
+                f"Written frames: {written_frames:,}\n"
+                f"Pieces: {len(pieces):,}\n\n"
+                f"Manifest saved to:\n{manifest_file}")
+        
+        except Exception as e:
+            if piece is not None and not piece["file"].closed:
+                piece["file"].close()
+            messagebox.showerror("Error", f"An error occurred:\n{str(e)}")
+            self.status_label.config(text="Error occurred!")
+        finally:
+            self.progress['value'] = 0
+    
     def save_preset(self):
-        """Save current CAN IDs as a preset"""
+        """Save current CAN IDs (and filter expression, if any) as a preset"""
         preset_name = self.preset_name_entry.get().strip()
         can_ids = self.can_ids_entry.get().strip()
+        expression = self.expression_entry.get().strip()
         
         if not preset_name:
             messagebox.showwarning("Warning", "Please enter a preset name.")
             return
         
-        if not can_ids:
-            messagebox.showwarning("Warning", "Please enter CAN IDs to save.")
+        if not can_ids and not expression:
+            messagebox.showwarning("Warning", "Please enter CAN IDs or a filter expression to save.")
             return
         
         presets = self.load_presets_from_file()
-        presets[preset_name] = can_ids
+        # Plain CAN ID presets stay plain strings so older versions can still read them
+        if expression:
+            presets[preset_name] = {"can_ids": can_ids, "expression": expression}
+        else:
+            presets[preset_name] = can_ids
         
         try:
             with open(self.presets_file, "w") as f:
@@ -332,8 +1374,13 @@ class CANFilterTool:
         presets = self.load_presets_from_file()
         
         if preset_name in presets:
+            preset = presets[preset_name]
+            if not isinstance(preset, dict):
+                preset = {"can_ids": preset}
             self.can_ids_entry.delete(0, tk.END)
-            self.can_ids_entry.insert(0, presets[preset_name])
+            self.can_ids_entry.insert(0, preset.get("can_ids", ""))
+            self.expression_entry.delete(0, tk.END)
+            self.expression_entry.insert(0, preset.get("expression", ""))
             self.status_label.config(text=f"Loaded preset: {preset_name}")
         else:
             messagebox.showerror("Error", "Preset not found!")
@@ -358,6 +1405,13 @@ class CANFilterTool:
         self.input_file_var.set("")
         self.output_file_var.set("")
         self.can_ids_entry.delete(0, tk.END)
+        self.expression_entry.delete(0, tk.END)
+        self.delta_mode_var.set(False)
+        self.keepalive_seconds_var.set("")
+        self.delta_masks_var.set("")
+        self.split_seconds_var.set("")
+        self.split_megabytes_var.set("")
+        self.split_filter_var.set(False)
         self.preset_name_entry.delete(0, tk.END)
         self.progress['value'] = 0
         self.status_label.config(text="Ready")